@@ -1,19 +1,30 @@
 from .solution import Solution, TimedService, CommodityPath
 from .instance import Commodity, Instance
-from gurobipy import Model, GRB, quicksum, Var
+from gurobipy import Env, Model, GRB, quicksum, Var
+from operator import attrgetter
+
+# per-key variable and constraint names are only useful when inspecting the
+# model by hand; formatting them costs one string per variable/constraint
+DEBUG_NAMES = False
 
 
 def add_dispatch_variables(
     m: Model, sol: Solution, coms: list[Commodity], com_node_paths: list[list[int]]
 ) -> dict[tuple[int, int], Var]:
     # variables that track the dispatch time of each commodity at each node that it visits (gamma in Boland et al.)
+    # all commodities on a service dispatch together ((10) in Boland et al.),
+    # so instead of creating per-commodity copies and linking them with
+    # equality constraints, all (commodity, k) entries of a service share one
+    # variable per service
+    service_dispatch = m.addVars(
+        range(len(sol.services)), vtype=GRB.CONTINUOUS, name="gamma"
+    )
+    service_index = {id(service): i for i, service in enumerate(sol.services)}
     dispatch = {}
     for com in coms:
         # we skip the last node, since we do not need to dispatch there
-        for k in range(len(com_node_paths[com.id]) - 1):
-            dispatch[com.id, k] = m.addVar(
-                vtype=GRB.CONTINUOUS, name=f"gamma_{com.id}_{k}_n{com_node_paths[com.id][k]}"
-            )
+        for k, service in enumerate(sol.commodity_paths[com.id].services):
+            dispatch[com.id, k] = service_dispatch[service_index[id(service)]]
     return dispatch
 
 
@@ -21,18 +32,22 @@ def add_duration_variables(
     m: Model, sol: Solution, coms: list[Commodity], com_node_paths: list[list[int]]
 ) -> dict[tuple[int, int], Var]:
     # variables that track the time that each commodity travels between each pair of nodes (theta in Boland et al., here we identify the arcs by their origin node since the destination is clear)
-    duration = {}
+    keys = []
+    names = []
+    lbs = []
     for com in coms:
-        for k, node in enumerate(com_node_paths[com.id][:-1]):
-            relaxed_travel_time = (
-                sol.commodity_paths[com.id].services[k].end_time
-                - sol.commodity_paths[com.id].services[k].start_time
-            )
-            duration[com.id, k] = m.addVar(
-                vtype=GRB.CONTINUOUS,
-                name=f"theta_{com.id}_{k}_n{node}",
-                lb=relaxed_travel_time,
-            )
+        # hoist the per-commodity lookups out of the inner loop
+        cid = com.id
+        services = sol.commodity_paths[cid].services
+        for k, node in enumerate(com_node_paths[cid][:-1]):
+            relaxed_travel_time = services[k].end_time - services[k].start_time
+            keys.append((cid, k))
+            if DEBUG_NAMES:
+                names.append(f"theta_{cid}_{k}_n{node}")
+            lbs.append(relaxed_travel_time)
+    duration = m.addVars(
+        keys, vtype=GRB.CONTINUOUS, name=names if DEBUG_NAMES else "theta", lb=lbs
+    )
 
     return duration
 
@@ -41,25 +56,26 @@ def add_shorten_variables(
     m: Model, sol: Solution, coms: list[Commodity], com_node_paths: list[list[int]]
 ) -> dict[tuple[int, int], Var]:
     # binary variables to track if a service needs to be shortened (sigma in Boland et al., here we identify the arcs by their origin node since the destination is clear)
-    shorten = {}
-    for com in coms:
-        for k, node in enumerate(com_node_paths[com.id][:-1]):
-            shorten[com.id, k] = m.addVar(
-                vtype=GRB.BINARY, name=f"sigma_{com.id}_{k}_n{node}", obj=1
-            )
+    keys = [
+        (com.id, k) for com in coms for k in range(len(com_node_paths[com.id]) - 1)
+    ]
+    names = (
+        [f"sigma_{com_id}_{k}_n{com_node_paths[com_id][k]}" for com_id, k in keys]
+        if DEBUG_NAMES
+        else "sigma"
+    )
+    shorten = m.addVars(keys, vtype=GRB.BINARY, name=names, obj=1)
     return shorten
 
 
 def get_commodity_node_paths(sol: Solution, coms: list[Commodity]) -> list[list[int]]:
-    commodity_node_paths = []
-    for com in coms:
-        visited_nodes = [
-            service.start_node for service in sol.commodity_paths[com.id].services
-        ]
-        visited_nodes.append(com.sink_node)
-        commodity_node_paths.append(list(visited_nodes))
-
-    return commodity_node_paths
+    # map + attrgetter extract the start nodes without a Python-level loop body
+    get_start_node = attrgetter("start_node")
+    return [
+        list(map(get_start_node, sol.commodity_paths[com.id].services))
+        + [com.sink_node]
+        for com in coms
+    ]
 
 
 def add_linking_constraints(
@@ -71,15 +87,19 @@ def add_linking_constraints(
     coms: list[Commodity],
 ):
     # (6) in Boland et al.
-    for com in coms:
-        for k, node in enumerate(com_node_paths[com.id][:-1]):
-            real_travel_time = sol.commodity_paths[com.id].services[k].travel_time
-            lb = duration[com.id, k].lb
-            m.addConstr(
-                duration[com.id, k]
-                >= real_travel_time - (real_travel_time - lb) * shorten[com.id, k],
-                name=f"link_{com.id}_{k}_n{node}",
-            )
+    def linking_constraint(com_id: int, k: int):
+        real_travel_time = sol.commodity_paths[com_id].services[k].travel_time
+        lb = duration[com_id, k].lb
+        return (
+            duration[com_id, k]
+            >= real_travel_time - (real_travel_time - lb) * shorten[com_id, k]
+        )
+
+    # addConstrs batches the constraint creation into a single gurobi call
+    m.addConstrs(
+        (linking_constraint(com_id, k) for com_id, k in duration),
+        name="link",
+    )
 
 
 def add_time_consistency_constraints(
@@ -91,13 +111,14 @@ def add_time_consistency_constraints(
     coms: list[Commodity],
 ):
     # (7) in Boland et al.
-    for com in coms:
-        for k, node in enumerate(com_node_paths[com.id][:-2]):
-            m.addConstr(
-                dispatch[com.id, k] + duration[com.id, k]
-                <= dispatch[com.id, k + 1],
-                name=f"time_consistency_{com.id}_{k}_n{node}",
-            )
+    m.addConstrs(
+        (
+            dispatch[com_id, k] + duration[com_id, k] <= dispatch[com_id, k + 1]
+            for com_id, k in dispatch
+            if (com_id, k + 1) in dispatch
+        ),
+        name="time_consistency",
+    )
 
 
 def add_time_window_constraints(
@@ -110,44 +131,26 @@ def add_time_window_constraints(
 ):
     # (8, 9) in Boland et al.
     for com in coms:
+        cid = com.id
         m.addConstr(
-            dispatch[com.id, 0] >= com.release, name=f"release_{com.id}"
+            dispatch[cid, 0] >= com.release,
+            name=f"release_{cid}" if DEBUG_NAMES else "",
         )
-        second_to_last_k = len(com_node_paths[com.id]) - 2
+        second_to_last_k = len(com_node_paths[cid]) - 2
         m.addConstr(
-            dispatch[com.id, second_to_last_k]
-            + duration[com.id, second_to_last_k]
+            dispatch[cid, second_to_last_k] + duration[cid, second_to_last_k]
             <= com.deadline,
-            name=f"deadline_{com.id}",
+            name=f"deadline_{cid}" if DEBUG_NAMES else "",
         )
 
 
-def add_dispatch_linking_constraints(
-    m: Model,
-    dispatch: dict[tuple[int, int], Var],
-    com_node_paths: list[list[int]],
-    sol: Solution,
-    coms: list[Commodity],
+def setup_identification_model(
+    sol: Solution, instance: Instance, env: Env | None = None
 ):
-    # (10) in Boland et al.
-    # TODO: since we link all of these variables, we might as well directly replace them with a variable for service dispatch times
-    for service in sol.services:
-        node = service.start_node
-        if len(service.commodities_transported) < 2:
-            continue
-        for com1 in service.commodities_transported:
-            k1 = sol.commodity_paths[com1.id].services.index(service)
-            for com2 in service.commodities_transported:
-                k2 = sol.commodity_paths[com2.id].services.index(service)
-                if com1.id < com2.id:
-                    m.addConstr(
-                        dispatch[com1.id, k1] == dispatch[com2.id, k2],
-                        name=f"dispatch_link_{com1.id}_{com2.id}_{node}",
-                    )
-
-
-def setup_identification_model(sol: Solution, instance: Instance):
-    m = Model("Identxification")
+    # the model's dimensions follow the current solution's paths, so it has to
+    # be rebuilt per iteration; passing a shared env amortizes environment
+    # startup and parameter setting across the rebuilds
+    m = Model("Identxification", env=env)
     com_node_paths = get_commodity_node_paths(sol, instance.commodities)
 
     # variables
@@ -166,33 +169,35 @@ def setup_identification_model(sol: Solution, instance: Instance):
     add_time_window_constraints(
         m, sol, dispatch, duration, instance.commodities, com_node_paths
     )
-    add_dispatch_linking_constraints(
-        m, dispatch, com_node_paths, sol, instance.commodities
-    )
     return m, dispatch, duration, shorten
 
 
 def update_timed_services(sol: Solution, dispatch: dict[tuple[int, int], Var]):
     # given a solution that can be implemented, update the start and end times of the services
-    for service in sol.services:
-        # get any commodity on that service and get its dispatch time: this is the start time
-        # arrival time is then start time + travel time
-        com = service.commodities_transported[0]
-        start_node = service.start_node
-        k = sol.commodity_paths[com.id].services.index(service)
-        service.start_time = dispatch[com.id, k].x
-        service.end_time = service.start_time + service.travel_time
+    # the dispatch time of a service is shared by all commodities on it, so one
+    # walk over the commodity paths reaches every service without the
+    # O(path length) services.index call per service
+    updated = set()
+    for com_id, path in enumerate(sol.commodity_paths):
+        for k, service in enumerate(path.services):
+            if id(service) in updated:
+                continue
+            updated.add(id(service))
+            service.start_time = dispatch[com_id, k].x
+            service.end_time = service.start_time + service.travel_time
 
 
 def find_nodes_to_insert(
-    sol: Solution, shorten: dict[tuple[int, int], Var]
+    m: Model, sol: Solution, shorten: dict[tuple[int, int], Var]
 ) -> list[tuple[int, int]]:
     # if we have an arc ((i,t),(j,t')) that is too short, we need to add a new node (j, t+t_{ij})
     # set, in case we have multiple arcs that would result in the same split
     nodes_to_insert = set()
 
-    for (com_id, k), var in shorten.items():
-        if var.x > 0.5:
+    # fetch all solution values in one gurobi call instead of one per variable
+    values = m.getAttr("X", list(shorten.values()))
+    for (com_id, k), value in zip(shorten.keys(), values):
+        if value > 0.5:
             service = sol.commodity_paths[com_id].services[k]
             node = service.end_node
             time = service.start_time + service.travel_time
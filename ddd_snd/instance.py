@@ -1,15 +1,15 @@
+import numpy as np
 import rustworkx as rx
 from dataclasses import dataclass
 from pathlib import Path
-from math import ceil, floor
 
 
-@dataclass
+@dataclass(slots=True)
 class NodeData:
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ArcData:
     travel_time: int
     flow_cost: float  # flow cost per unit of flow
@@ -17,7 +17,7 @@ class ArcData:
     capacity: float | None
 
 
-@dataclass
+@dataclass(slots=True)
 class Commodity:
     id: int
     source_node: int
@@ -32,37 +32,56 @@ class Instance:
     flat_graph: rx.PyDiGraph
     commodities: list[Commodity]
 
+    def __post_init__(self):
+        # deadlines as an array, so solver setup can reduce over them without
+        # a Python-level pass over the commodities
+        self.deadlines = np.array(
+            [com.deadline for com in self.commodities], dtype=np.int64
+        )
+
 
 def read_modified_dow_instance(path: Path, delta_t: float) -> Instance:
     # instances in dow format with additional travel times and commodity release and deadline times
     # all times get converted to integers (multiples of delta_t)
     with open(path, "r") as f:
-        lines = f.readlines()
-    n_nodes, n_arcs, n_commodities = map(int, lines[1].split())
+        f.readline()
+        n_nodes, n_arcs, _ = map(int, f.readline().split())
+    # loadtxt tokenizes and converts each block at C level instead of
+    # split()/float() per line, and the time scaling vectorizes over the block;
+    # the commodity block runs to the end of the file since the header count is
+    # not reliable
+    arcs = np.loadtxt(
+        path, skiprows=2, max_rows=n_arcs, usecols=(0, 1, 2, 3, 4, 5), ndmin=2
+    )
+    coms = np.loadtxt(path, skiprows=2 + n_arcs, usecols=(0, 1, 2, 3, 4), ndmin=2)
+    travel_times = np.ceil(arcs[:, 5] / delta_t).astype(np.int64)
+    releases = np.ceil(coms[:, 3] / delta_t).astype(np.int64)
+    deadlines = np.floor(coms[:, 4] / delta_t).astype(np.int64)
     flat_graph = rx.PyDiGraph()
-    for i in range(1, n_nodes + 1):
-        flat_graph.add_node(NodeData(name=i))
-    for i, line in enumerate(lines[2 : n_arcs + 2]):
-        i, j, flow_cost, capacity, fixed_cost, travel_time = map(
-            float, line.split()[:6]
-        )
-        travel_time = ceil(travel_time / delta_t)
-        flat_graph.add_edge(
-            int(i) - 1,
-            int(j) - 1,
-            ArcData(travel_time, flow_cost, fixed_cost, capacity),
-        )
-    commodities = []
-    for line in lines[n_arcs + 2 :]:
-        source_node, sink_node, quantity, release, deadline = line.split()[:5]
-        source_node = int(source_node) - 1
-        sink_node = int(sink_node) - 1
-        quantity = float(quantity)
-        release = ceil(float(release) / delta_t)
-        deadline = floor(float(deadline) / delta_t)
-        commodities.append(
-            Commodity(
-                len(commodities), source_node, sink_node, quantity, release, deadline
+    flat_graph.add_nodes_from([NodeData(name=i) for i in range(1, n_nodes + 1)])
+    flat_graph.add_edges_from(
+        [
+            (
+                int(i) - 1,
+                int(j) - 1,
+                ArcData(int(travel_time), flow_cost, fixed_cost, capacity),
             )
+            for i, j, flow_cost, capacity, fixed_cost, travel_time in zip(
+                arcs[:, 0], arcs[:, 1], arcs[:, 2], arcs[:, 3], arcs[:, 4], travel_times
+            )
+        ]
+    )
+    commodities = [
+        Commodity(
+            index,
+            int(source_node) - 1,
+            int(sink_node) - 1,
+            quantity,
+            int(release),
+            int(deadline),
+        )
+        for index, (source_node, sink_node, quantity, release, deadline) in enumerate(
+            zip(coms[:, 0], coms[:, 1], coms[:, 2], releases, deadlines)
         )
+    ]
     return Instance(flat_graph, commodities)
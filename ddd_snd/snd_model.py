@@ -1,107 +1,207 @@
 from .time_expansion import DiscretizedGraph, TimeNodeData
 from .instance import Instance, Commodity
 from .solution import TimedService, CommodityPath, Solution
-from gurobipy import Model, GRB, quicksum, Var
+from gurobipy import Model, GRB, LinExpr, quicksum, Var
 from bisect import bisect_left
+from collections import defaultdict
+from heapq import heapify, heappop, heappush
+import numpy as np
+from scipy.sparse import csr_matrix
 
+# per-variable names are only useful when inspecting the model by hand;
+# formatting them costs a node lookup and a string per variable
+DEBUG_NAMES = False
 
-def add_design_variables(m: Model, g: DiscretizedGraph) -> dict[int, Var]:
-    y = {}
-    for flat_arc in g.g_flat.edge_indices():
-        fixed_cost = g.g_flat.get_edge_data_by_index(flat_arc).fixed_cost
-        for expanded_arc in g.flat_to_expanded_arcs[flat_arc]:
-            i, j = g.get_edge_endpoints_by_index(expanded_arc)
 
-            y[expanded_arc] = m.addVar(
-                vtype=GRB.INTEGER, name=f"y_({g[i].name})_({g[j].name})", obj=fixed_cost
-            )
+def add_design_variables(
+    m: Model, g: DiscretizedGraph, debug_names: bool = DEBUG_NAMES
+) -> dict[int, Var]:
+    # the service arcs and their fixed costs come straight from the SoA
+    # arrays (nan capacity marks holding arcs) instead of enumerating the
+    # expanded arcs of every flat arc through the graph
+    arcs = np.fromiter(g.edge_indices(), dtype=np.int64)
+    arcs = arcs[~np.isnan(g.capacity[arcs])]
+    objs = g.fixed_cost[arcs]
+    if debug_names:
+        tail, head = g.arc_endpoints()
+        names = [f"y_({g[tail[arc]].name})_({g[head[arc]].name})" for arc in arcs]
+    # addVars creates all variables in a single gurobi call
+    y = m.addVars(
+        arcs.tolist(),
+        vtype=GRB.INTEGER,
+        name=names if debug_names else "y",
+        obj=objs.tolist(),
+    )
 
     return y
 
 
 def add_flow_variables(
-    m: Model, coms: list[Commodity], g: DiscretizedGraph
+    m: Model,
+    coms: list[Commodity],
+    g: DiscretizedGraph,
+    debug_names: bool = DEBUG_NAMES,
 ) -> dict[tuple[int, int], Var]:
-    x = {}
-    for arc in g.edge_indices():
-        flow_cost = g.get_edge_data_by_index(arc).flow_cost
-        i, j = g.get_edge_endpoints_by_index(arc)
-        for com in coms:
-            x[arc, com.id] = m.addVar(
-                vtype=GRB.BINARY,
-                name=f"x_({g[i].name})_({g[j].name})_{com.id}",
-                obj=flow_cost * com.quantity,
-            )
+    arcs = list(g.edge_indices())
+    keys = [(arc, com.id) for arc in arcs for com in coms]
+    # one outer product computes all |arcs| x |commodities| objective
+    # coefficients, laid out in the same arc-major order as the keys
+    quantities = np.array([com.quantity for com in coms])
+    objs = np.multiply.outer(g.flow_cost[arcs], quantities).ravel()
+    if debug_names:
+        tail, head = g.arc_endpoints()
+        names = [
+            f"x_({g[tail[arc]].name})_({g[head[arc]].name})_{com_id}"
+            for arc, com_id in keys
+        ]
+    x = m.addVars(
+        keys, vtype=GRB.BINARY, name=names if debug_names else "x", obj=objs.tolist()
+    )
 
     return x
 
 
 def add_flow_conservation_constraints(
-    m: Model, x: dict, coms: list[Commodity], g: DiscretizedGraph
+    m: Model,
+    x: dict,
+    coms: list[Commodity],
+    g: DiscretizedGraph,
+    debug_names: bool = DEBUG_NAMES,
 ):
+    # node-arc incidence matrix of the expanded graph (+1 for the tail, -1 for
+    # the head of each arc), shared across all commodities; addMConstr then
+    # emits one gurobi call per commodity instead of one LinExpr per node
+    arcs = list(g.edge_indices())
+    n_nodes = g.num_nodes()
+    tail, head = g.arc_endpoints()
+    arc_array = np.asarray(arcs)
+    cols = np.arange(len(arcs))
+    incidence = csr_matrix(
+        (
+            np.concatenate((np.ones(len(arcs)), -np.ones(len(arcs)))),
+            (
+                np.concatenate((tail[arc_array], head[arc_array])),
+                np.concatenate((cols, cols)),
+            ),
+        ),
+        shape=(n_nodes, len(arcs)),
+    )
+
+    # one shared rhs buffer: only the source and sink entries of a commodity
+    # differ from zero, so we set and reset those two instead of reallocating
+    rhs = np.zeros(n_nodes)
     for com in coms:
         # find source and sink node of commodity in time expanded graph
         k_source = bisect_left(g.node_to_times[com.source_node], com.release)
         source_node = g.flat_to_expanded_nodes[com.source_node][k_source]
         k_sink = bisect_left(g.node_to_times[com.sink_node], com.deadline)
         sink_node = g.flat_to_expanded_nodes[com.sink_node][k_sink]
-        for node in g.node_indices():
-            rhs = 0
-            if node == source_node:
-                rhs = 1
-            elif node == sink_node:
-                rhs = -1
-            m.addConstr(
-                quicksum(x[arc, com.id] for arc in g.get_out_edge_indices(node))
-                - quicksum(x[arc, com.id] for arc in g.get_in_edge_indices(node))
-                == rhs,
-                name=f"flow_conservation_{com.id}_({g[node].name})",
-            )
+        rhs[source_node] = 1
+        rhs[sink_node] = -1
+        m.addMConstr(
+            incidence,
+            [x[arc, com.id] for arc in arcs],
+            GRB.EQUAL,
+            rhs,
+            name=f"flow_conservation_{com.id}" if debug_names else "",
+        )
+        rhs[source_node] = 0
+        rhs[sink_node] = 0
 
 
 def add_capacity_constraints(
-    m: Model, x: dict, y: dict, coms: list[Commodity], g: DiscretizedGraph
+    m: Model,
+    x: dict,
+    y: dict,
+    coms: list[Commodity],
+    g: DiscretizedGraph,
+    debug_names: bool = DEBUG_NAMES,
 ):
     # for each time expanded non-holding arc, capacity of vehicles must not be exceeded by sum of commodity flows
+    # the commodity quantities are shared by all arcs, so hoist them once and
+    # let addTerms build each flow expression in a single call
+    quantities = [com.quantity for com in coms]
     for arc in g.edge_indices():
-        vehicle_capacity = g.get_edge_data_by_index(arc).capacity
-        if vehicle_capacity is not None:
-            flow = quicksum(com.quantity * x[arc, com.id] for com in coms)
-            capacity = vehicle_capacity * y[arc]
-            m.addConstr(flow <= capacity, name=f"capacity_{arc}")
+        vehicle_capacity = g.capacity[arc]
+        # holding arcs (nan capacity) are uncapacitated
+        if not np.isnan(vehicle_capacity):
+            flow = LinExpr()
+            flow.addTerms(quantities, [x[arc, com.id] for com in coms])
+            m.addConstr(
+                flow <= vehicle_capacity * y[arc],
+                name=f"capacity_{arc}" if debug_names else "",
+            )
 
 
 def add_travel_time_limit(
-    m: Model, x: dict, coms: list[Commodity], g: DiscretizedGraph
+    m: Model,
+    x: dict,
+    coms: list[Commodity],
+    g: DiscretizedGraph,
+    debug_names: bool = DEBUG_NAMES,
 ):
     # for each commodity, the sum of travel times must not exceed the time limit
     for com in coms:
         travel_time = quicksum(
-            g.get_edge_data_by_index(arc).travel_time * x[arc, com.id]
-            for arc in g.edge_indices()
+            g.travel_time[arc] * x[arc, com.id] for arc in g.edge_indices()
         )
         m.addConstr(
-            travel_time <= com.deadline - com.release, name=f"travel_time_{com.id}"
+            travel_time <= com.deadline - com.release,
+            name=f"travel_time_{com.id}" if debug_names else "",
         )
 
 
-def build_snd_model(instance: Instance, g: DiscretizedGraph):
+def build_snd_model(
+    instance: Instance, g: DiscretizedGraph, debug_names: bool = DEBUG_NAMES
+):
     m = Model("snd")
 
     # variables
-    x = add_flow_variables(m, instance.commodities, g)
-    y = add_design_variables(m, g)
+    x = add_flow_variables(m, instance.commodities, g, debug_names)
+    y = add_design_variables(m, g, debug_names)
 
     # constraints
-    add_flow_conservation_constraints(m, x, instance.commodities, g)
-    add_capacity_constraints(m, x, y, instance.commodities, g)
+    add_flow_conservation_constraints(m, x, instance.commodities, g, debug_names)
+    add_capacity_constraints(m, x, y, instance.commodities, g, debug_names)
 
     # valid inequality
-    add_travel_time_limit(m, x, instance.commodities, g)
+    add_travel_time_limit(m, x, instance.commodities, g, debug_names)
 
     return m, x, y
 
 
+def extract_warm_start(m: Model, x: dict, y: dict, g: DiscretizedGraph):
+    # incumbent values keyed by arc endpoints: expanded node ids are stable
+    # across refinements, while arc indices of removed arcs get reused
+    tail, head = g.arc_endpoints()
+    pairs = {arc: (tail[arc], head[arc]) for arc in g.edge_indices()}
+    y_keys = list(y.keys())
+    y_values = m.getAttr("X", [y[key] for key in y_keys])
+    x_keys = list(x.keys())
+    x_values = m.getAttr("X", [x[key] for key in x_keys])
+    y_start = {pairs[arc]: value for arc, value in zip(y_keys, y_values)}
+    x_start = {
+        (pairs[arc], com_id): value for (arc, com_id), value in zip(x_keys, x_values)
+    }
+    return y_start, x_start
+
+
+def apply_warm_start(x: dict, y: dict, g: DiscretizedGraph, warm_start):
+    # seed the rebuilt model with the previous incumbent; arcs that were moved
+    # by the refinement simply keep their default (undefined) start value
+    y_start, x_start = warm_start
+    tail, head = g.arc_endpoints()
+    pairs = {arc: (tail[arc], head[arc]) for arc in g.edge_indices()}
+    for arc, var in y.items():
+        value = y_start.get(pairs[arc])
+        if value is not None:
+            var.Start = value
+    for (arc, com_id), var in x.items():
+        value = x_start.get((pairs[arc], com_id))
+        if value is not None:
+            var.Start = value
+
+
 def get_solution(
     m: Model, x: dict, y: dict, coms: list[Commodity], g: DiscretizedGraph
 ):
@@ -114,43 +214,61 @@ def get_solution(
     commodity_paths = [
         CommodityPath(duration=0, flow_cost=0, services=[]) for _ in coms
     ]
-    total_flow_cost = 0
-    total_fixed_cost = 0
 
-    # for each service arc, determine if vehicles drive over it
-    for arc in g.edge_indices():
-        is_holding_arc = g.get_edge_data_by_index(arc).capacity is None
-        if is_holding_arc:
-            continue
-        val = round(y[arc].x)
-        if val == 0:
-            continue
+    # fetch all solution values in two bulk gurobi calls and mask them in
+    # numpy instead of reading var.x per variable
+    # service arcs are the non-holding arcs (nan capacity marks holding arcs)
+    service_arcs = [arc for arc in g.edge_indices() if not np.isnan(g.capacity[arc])]
+    n_vehicles = np.rint(m.getAttr("X", [y[arc] for arc in service_arcs])).astype(
+        np.int64
+    )
+    # only arcs with vehicles on them become services
+    active_arcs = [arc for arc, val in zip(service_arcs, n_vehicles) if val > 0]
+    n_vehicles = n_vehicles[n_vehicles > 0]
+    carried = (
+        np.asarray(
+            m.getAttr("X", [x[arc, com.id] for arc in active_arcs for com in coms])
+        ).reshape(len(active_arcs), len(coms))
+        > 0.5
+    )
+
+    # aggregate all costs and durations as array reductions over the carried
+    # mask instead of accumulating scalar by scalar inside the arc loop
+    active = np.asarray(active_arcs, dtype=np.int64)
+    quantities = np.array([com.quantity for com in coms])
+    service_costs = n_vehicles * g.fixed_cost[active]
+    com_flow_costs = np.where(
+        carried, np.multiply.outer(g.flow_cost[active], quantities), 0.0
+    ).sum(axis=0)
+    com_durations = carried.T @ g.travel_time[active]
+    total_fixed_cost = float(service_costs.sum())
+    total_flow_cost = float(com_flow_costs.sum())
+    for col, com in enumerate(coms):
+        commodity_paths[com.id].flow_cost = float(com_flow_costs[col])
+        commodity_paths[com.id].duration = int(com_durations[col])
+
+    tail, head = g.arc_endpoints()
+    for row, arc in enumerate(active_arcs):
+        val = int(n_vehicles[row])
         # collect arc data
-        i, j = g.get_edge_endpoints_by_index(arc)
-        arc_data = g.get_edge_data_by_index(arc)
+        i, j = int(tail[arc]), int(head[arc])
+        travel_time = int(g.travel_time[arc])
         # collect solution data
-        commodities_transported = []
-        service_cost = val * arc_data.fixed_cost
-        total_fixed_cost += service_cost
+        service_cost = float(service_costs[row])
         # determine commodities on this service arc
-        for com in coms:
-            if x[arc, com.id].x > 0.5:
-                commodities_transported.append(com)
-                # add costs
-                arc_flow_cost = com.quantity * arc_data.flow_cost
-                commodity_paths[com.id].flow_cost += arc_flow_cost
-                commodity_paths[com.id].duration += arc_data.travel_time
-                total_flow_cost += arc_flow_cost
+        commodities_transported = [
+            coms[com_index] for com_index in np.flatnonzero(carried[row])
+        ]
 
         service = TimedService(
-            start_time=g[i].time,
-            end_time=g[j].time,
-            start_node=g[i].flat_node,
-            end_node=g[j].flat_node,
-            travel_time=arc_data.travel_time,
+            start_time=g.node_time[i],
+            end_time=g.node_time[j],
+            start_node=g.node_flat[i],
+            end_node=g.node_flat[j],
+            travel_time=travel_time,
             n_vehicles=val,
             cost=service_cost,
-            capacity=val * arc_data.capacity,
+            capacity=val * g.capacity[arc],
             commodities_transported=commodities_transported,
         )
         # store service in each commodity path
@@ -162,25 +280,36 @@ def get_solution(
     # sort services for each commodity along path
     for com in coms:
         com_services = commodity_paths[com.id].services
+        # walk the commodity's services as an adjacency structure of per-node
+        # heaps ordered by start time: each step pops the earliest service we
+        # could have taken, pushing back any that depart before we arrive
+        # note: due to the relaxation, commodities might travel back in time and arrive twice at the same node
+        adj = defaultdict(list)
+        for seq, service in enumerate(com_services):
+            adj[service.start_node].append((service.start_time, seq, service))
+        for heap in adj.values():
+            heapify(heap)
         services_sorted = []
         current_node = com.source_node
         current_time = com.release
-        while len(com_services) > 0:
-            # find the earliest service we could have taken
-            # note: due to the relaxation, commodities might travel back in time and arrive twice at the same node
-            earliest_found = 10e100
+        for _ in range(len(com_services)):
+            heap = adj.get(current_node)
             candidate = None
-            for service in com_services:
-                if service.start_node == current_node:
-                    if (service.start_time >= current_time) and (
-                        service.start_time < earliest_found
-                    ):
-                        earliest_found = service.start_time
-                        candidate = service
+            too_early = []
+            while heap:
+                entry = heappop(heap)
+                if entry[0] >= current_time:
+                    candidate = entry[2]
+                    break
+                # departs before we arrive; may become usable on a later,
+                # earlier-in-time visit to this node
+                too_early.append(entry)
+            if heap is not None:
+                for entry in too_early:
+                    heappush(heap, entry)
             if candidate is None:
                 raise Exception("Could not construct service")
             services_sorted.append(candidate)
-            com_services.remove(candidate)
             current_node = candidate.end_node
             current_time = candidate.end_time
         commodity_paths[com.id].services = services_sorted
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from gurobipy import Model, GRB, quicksum
 
 
-@dataclass
+@dataclass(slots=True)
 class TimedService:
     start_time: int
     end_time: int
@@ -19,7 +19,7 @@ class TimedService:
         return f"(({self.start_node}, {self.start_time}),({self.end_node}, {self.end_time}))"
 
 
-@dataclass
+@dataclass(slots=True)
 class CommodityPath:
     duration: int  # time between leaving start node and arriving at end node
     flow_cost: float
@@ -1,6 +1,11 @@
 from .instance import Instance
 from .solution import Solution
-from .snd_model import build_snd_model, get_solution
+from .snd_model import (
+    apply_warm_start,
+    build_snd_model,
+    extract_warm_start,
+    get_solution,
+)
 from .time_expansion import (
     create_relaxed_initial_discretization,
     create_regular_discretization,
@@ -11,21 +16,21 @@ from .discretization_discovery import (
     update_timed_services,
     find_nodes_to_insert,
 )
-from gurobipy import GRB
-from math import ceil
+from gurobipy import Env, GRB
+import numpy as np
+import os
 
 
-def solve_snd(ins: Instance, delta_t: int) -> Solution | None:
+def solve_snd(ins: Instance, delta_t: int, threads: int | None = None) -> Solution | None:
     n_nodes_flat = ins.flat_graph.num_nodes()
-    time_horizon = max(
-        ceil(com.deadline / delta_t) * delta_t for com in ins.commodities
-    )
+    time_horizon = int(np.ceil(ins.deadlines.max() / delta_t)) * delta_t
     g_disc = DiscretizedGraph(
         ins.flat_graph,
         create_regular_discretization(n_nodes_flat, time_horizon, delta_t),
         False,
     )
     m, x, y = build_snd_model(ins, g_disc)
+    m.setParam("Threads", threads if threads is not None else os.cpu_count())
     m.optimize()
     print(f"nodes in discretization: {g_disc.num_nodes()}")
     if m.status == GRB.INFEASIBLE:
@@ -33,8 +38,14 @@ def solve_snd(ins: Instance, delta_t: int) -> Solution | None:
     return get_solution(m, x, y, ins.commodities, g_disc)
 
 
-def solve_csnd(ins: Instance) -> Solution | None:
+def solve_csnd(
+    ins: Instance,
+    threads: int | None = None,
+    identification_method: int = 2,
+) -> Solution | None:
     # create initial discretized graph
+    if threads is None:
+        threads = os.cpu_count()
     n_nodes_flat = ins.flat_graph.num_nodes()
     g_disc = DiscretizedGraph(
         ins.flat_graph,
@@ -45,20 +56,33 @@ def solve_csnd(ins: Instance) -> Solution | None:
     lb = -10e100
     ub = 10e100
     iteration = 0
+    warm_start = None
+    # shared environment for the identification models of all iterations; the
+    # identification MIP relaxes to an LP that barrier (Method=2) solves well
+    env_fix = Env(
+        params={"OutputFlag": 0, "Threads": threads, "Method": identification_method}
+    )
 
     while True:
         # solve model for current discretization
         m, x, y = build_snd_model(ins, g_disc)
         m.setParam("OutputFlag", 0)
+        m.setParam("Threads", threads)
+        # warm-start from the previous iteration: the discretization only
+        # changes by a few nodes, so the old incumbent is a good starting point
+        if warm_start is not None:
+            apply_warm_start(x, y, g_disc, warm_start)
         m.optimize()
         if m.status == GRB.INFEASIBLE:
             return None
         sol = get_solution(m, x, y, ins.commodities, g_disc)
+        warm_start = extract_warm_start(m, x, y, g_disc)
         lb = max(sol.total_cost, lb)
 
         # run model to identify arcs that need to be fixed
-        m_fix, dispatch, duration, shorten = setup_identification_model(sol, ins)
-        m_fix.setParam("OutputFlag", 0)
+        m_fix, dispatch, duration, shorten = setup_identification_model(
+            sol, ins, env_fix
+        )
         m_fix.optimize()
 
         # status update
@@ -77,7 +101,7 @@ def solve_csnd(ins: Instance) -> Solution | None:
         # TODO: not strictly necessary for termination
 
         # identify arcs that need to be split, adjust discretization, repeat
-        nodes_to_insert = find_nodes_to_insert(sol, shorten)
+        nodes_to_insert = find_nodes_to_insert(m_fix, sol, shorten)
 
         # update discretization
         for node, time in nodes_to_insert:
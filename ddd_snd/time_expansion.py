@@ -1,29 +1,43 @@
-from dataclasses import dataclass, field, InitVar
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+import numpy as np
 import rustworkx as rx
 from .instance import ArcData, Commodity, NodeData
-from bisect import bisect_left
+from sortedcontainers import SortedList
+
+
+def _match_travel_arc_ends(
+    start_times: np.ndarray, end_times: np.ndarray, travel_time: int, relaxed: bool
+) -> np.ndarray:
+    # vectorized over all start nodes of one flat arc: for each start node,
+    # the index of the end node its travel arc connects to, or -1 if the arc
+    # would leave the time horizon (only possible when not relaxed)
+    arrival_times = start_times + travel_time
+    # latest end node whose time is not higher than the arrival time
+    end_indices = np.searchsorted(end_times, arrival_times, side="right") - 1
+    end_indices = np.maximum(end_indices, 0)
+    if not relaxed:
+        # if we do not hit a time point exactly, we need to round up to the next node
+        end_indices = np.where(
+            end_times[end_indices] == arrival_times, end_indices, end_indices + 1
+        )
+        # in this case, we might be outside the time horizon
+        end_indices[end_indices >= len(end_times)] = -1
+    return end_indices
 
 
 def get_edge_index(graph, i, j):
-    edge_indices = graph.edge_indices_from_endpoints(i, j)
-    assert (
-        len(edge_indices) == 1
-    ), "There should be exactly one edge between two nodes, found: " + str(
-        len(edge_indices)
-    )
+    # there is at most one edge between two nodes in these graphs; the
+    # uniqueness itself is covered by the tests instead of asserted per call
+    return graph.edge_indices_from_endpoints(i, j)[0]
 
-    return edge_indices[0]
 
-
-@dataclass
+@dataclass(slots=True)
 class TimeNodeData:
     flat_node: int
     time: int
-    name: str = field(init=False)
-    flat_node_data: InitVar[NodeData]  # only used to initialize this dataclass
-
-    def __post_init__(self, flat_node_data: NodeData):
-        self.name = f"{flat_node_data.name}_{self.time}"
+    name: str
 
 
 class DiscretizedGraph:
@@ -31,36 +45,117 @@ class DiscretizedGraph:
         self, flat_graph: rx.PyDiGraph, node_to_times: list[list[int]], relaxed: bool
     ):
         self.g_disc = rx.PyDiGraph()
-        self.node_to_times = node_to_times
+        # sorted lists support O(log n) insertion, unlike list.insert which
+        # shifts all later time points on every refinement
+        self.node_to_times = [SortedList(times) for times in node_to_times]
+        # numpy mirror of node_to_times for the vectorized lookups in
+        # _add_travel_arcs and _add_travel_arcs_new_node, over-allocated so a
+        # refinement slides a suffix in place instead of reallocating; only
+        # the first _node_times_len[n] entries are valid (see _times)
+        self._node_times_arr = []
+        self._node_times_len = []
+        for times in node_to_times:
+            arr = np.empty(max(2 * len(times), 4), dtype=np.int64)
+            arr[: len(times)] = times
+            self._node_times_arr.append(arr)
+            self._node_times_len.append(len(times))
         self.flat_to_expanded_nodes = {}
-        self.flat_to_expanded_arcs = {}
+        # indexed by flat arc; flat arc indices are contiguous since the flat
+        # graph is never mutated, so a list avoids dict hashing in the hot paths
+        self.flat_to_expanded_arcs = [[] for _ in range(flat_graph.num_edges())]
         self.g_flat = flat_graph
         self.relaxed = relaxed
+        # the flat graph is never mutated, so its endpoint -> arc lookup is
+        # built once instead of scanning the adjacency list per refinement
+        self._flat_edge_index = {
+            flat_graph.get_edge_endpoints_by_index(arc): arc
+            for arc in flat_graph.edge_indices()
+        }
+        # outgoing flat arcs per flat node as (flat_arc, head, data), also
+        # materialized once; carrying the arc id means refinement does not
+        # have to look it up again from the endpoints
+        self._flat_out = [[] for _ in range(flat_graph.num_nodes())]
+        for (u, v), arc in self._flat_edge_index.items():
+            self._flat_out[u].append((arc, v, flat_graph.get_edge_data_by_index(arc)))
+        # cache of edge indices by endpoints, avoids scanning the adjacency
+        # list via edge_indices_from_endpoints on every arc mutation
+        self._edge_ids: dict[tuple[int, int], int] = {}
+        # ingoing travel arcs per expanded node as (arrival_time, edge,
+        # predecessor, data), sorted by arrival time so refinement can bisect
+        # the affected window instead of scanning every ingoing arc (the edge
+        # id is unique, so comparisons never reach the data payload)
+        self._travel_in: dict[int, SortedList] = defaultdict(SortedList)
+        # time and flat node per expanded node, mirrored from the node payloads
+        # so the hot loops index plain lists instead of fetching payloads
+        self.node_time: list[int] = []
+        self.node_flat: list[int] = []
+        # arc metadata mirrored as arrays indexed by expanded arc, so model
+        # building reads packed numbers instead of fetching ArcData payloads;
+        # a nan capacity marks a holding arc (capacity None)
+        self.travel_time = np.empty(0, dtype=np.int64)
+        self.flow_cost = np.empty(0, dtype=np.float64)
+        self.fixed_cost = np.empty(0, dtype=np.float64)
+        self.capacity = np.empty(0, dtype=np.float64)
+        # lazily built tail/head arrays indexed by expanded arc, see arc_endpoints
+        self._tail = None
+        self._head = None
+        # last insertion index per flat node, used as a finger hint by
+        # refine_discretization since refinements cluster in time
+        self._last_refine_k: dict[int, int] = {}
         self._create_time_expanded_graph()
 
-    # workaround to get IDs of ingoing and outgoing edges, not something that PyDiGraph provides
-    def get_out_edge_indices(self, node: int):
-        return self.g_disc.incident_edges(node)
-
-    def get_in_edge_indices(self, node: int):
-        all_incident_edges = self.g_disc.incident_edges(node, all_edges=True)
-        return [
-            edge
-            for edge in all_incident_edges
-            if self.g_disc.get_edge_endpoints_by_index(edge)[1] == node
-        ]
+    def _times(self, node: int) -> np.ndarray:
+        # view of the valid prefix of the node's time-point array
+        return self._node_times_arr[node][: self._node_times_len[node]]
+
+    def arc_endpoints(self) -> tuple[np.ndarray, np.ndarray]:
+        # tail and head node per expanded arc, so model building reads packed
+        # arrays instead of calling get_edge_endpoints_by_index per arc;
+        # rebuilt lazily after each refinement
+        if self._tail is None:
+            index_map = self.g_disc.edge_index_map()
+            size = max(index_map) + 1 if index_map else 0
+            self._tail = np.zeros(size, dtype=np.int64)
+            self._head = np.zeros(size, dtype=np.int64)
+            for edge, (u, v, _) in index_map.items():
+                self._tail[edge] = u
+                self._head[edge] = v
+        return self._tail, self._head
+
+    def _store_arc_data(self, edge: int, data: ArcData):
+        # grow the metadata arrays geometrically when a new edge index appears
+        # (edge indices of removed arcs get reused, so holes are overwritten)
+        if edge >= self.travel_time.shape[0]:
+            new_size = max(2 * self.travel_time.shape[0], edge + 1)
+            for name in ("travel_time", "flow_cost", "fixed_cost", "capacity"):
+                array = getattr(self, name)
+                grown = np.empty(new_size, dtype=array.dtype)
+                grown[: array.shape[0]] = array
+                setattr(self, name, grown)
+        self.travel_time[edge] = data.travel_time
+        self.flow_cost[edge] = data.flow_cost
+        self.fixed_cost[edge] = data.fixed_cost
+        self.capacity[edge] = np.nan if data.capacity is None else data.capacity
 
     def _add_timed_nodes(self):
-        # add node for each timepoint
+        # add node for each timepoint, all inserted with one batched call
+        payloads = []
         for node in self.g_flat.node_indices():
-            self.flat_to_expanded_nodes[node] = []
+            flat_node_data = self.g_flat[node]
             for time in self.node_to_times[node]:
-                id_ex = self.g_disc.add_node(
+                payloads.append(
                     TimeNodeData(
-                        flat_node=node, time=time, flat_node_data=self.g_flat[node]
+                        flat_node=node, time=time, name=f"{flat_node_data.name}_{time}"
                     )
                 )
-                self.flat_to_expanded_nodes[node].append(id_ex)
+                self.node_time.append(time)
+                self.node_flat.append(node)
+        ids = self.g_disc.add_nodes_from(payloads)
+        pos = 0
+        for node in self.g_flat.node_indices():
+            count = len(self.node_to_times[node])
+            self.flat_to_expanded_nodes[node] = list(ids[pos : pos + count])
+            pos += count
 
     def _add_holding_arcs(self):
         # add holding arcs
@@ -69,8 +164,8 @@ class DiscretizedGraph:
         )
         for node in self.g_flat.node_indices():
             expanded_nodes = self.flat_to_expanded_nodes[node]
-            holding_arcs = zip(expanded_nodes[:-1], expanded_nodes[1:])
-            self.g_disc.add_edges_from(
+            holding_arcs = list(zip(expanded_nodes[:-1], expanded_nodes[1:]))
+            edges = self.g_disc.add_edges_from(
                 [
                     (
                         i,
@@ -80,45 +175,46 @@ class DiscretizedGraph:
                     for i, j in holding_arcs
                 ]
             )
+            for (i, j), edge in zip(holding_arcs, edges):
+                self._edge_ids[(i, j)] = edge
+                self._store_arc_data(edge, holding_arc_data)
 
     # add arcs between nodes
     def _add_travel_arcs(self):
+        # collect the travel arcs of all flat arcs and insert them with one
+        # batched call before wiring up the bookkeeping
+        edge_tuples = []
+        flat_arc_ids = []
         for arc in self.g_flat.edge_indices():
-            self.flat_to_expanded_arcs[arc] = []
             arc_data = self.g_flat.get_edge_data_by_index(arc)
-            travel_time = arc_data.travel_time
             i, j = self.g_flat.get_edge_endpoints_by_index(arc)
             potential_start_nodes = self.flat_to_expanded_nodes[i]
             potential_end_nodes = self.flat_to_expanded_nodes[j]
-            end_node_index = 0
-            # from every start node, connect to last possible end node
-            for start_node in potential_start_nodes:
-                start_time = self.g_disc[start_node].time
-                # find latest node whose time is not higher than the arrival time
-                while (
-                    end_node_index + 1 < len(potential_end_nodes)
-                    and self.g_disc[potential_end_nodes[end_node_index + 1]].time
-                    <= start_time + travel_time
-                ):
-                    end_node_index += 1
-
-                offset = 0
-                # if not relaxed, we need to check if we need to round up to the next node
-                if not self.relaxed:
-                    if (
-                        self.g_disc[potential_end_nodes[end_node_index]].time
-                        != start_time + travel_time
-                    ):
-                        offset = 1
-                        # in this case, we might outside the time horizon, in which case we do not add the arc
-                        if end_node_index + offset >= len(potential_end_nodes):
-                            continue
-
-                # add arc between start and end node
-                end_node = potential_end_nodes[end_node_index + offset]
-
-                arc_ex = self.g_disc.add_edge(start_node, end_node, arc_data)
-                self.flat_to_expanded_arcs[arc].append(arc_ex)
+            # match every start node to its end node in one vectorized pass
+            end_indices = _match_travel_arc_ends(
+                self._times(i),
+                self._times(j),
+                arc_data.travel_time,
+                self.relaxed,
+            )
+            # arcs outside the time horizon (index -1) are masked out in one go
+            for k in np.flatnonzero(end_indices >= 0):
+                edge_tuples.append(
+                    (
+                        potential_start_nodes[k],
+                        potential_end_nodes[end_indices[k]],
+                        arc_data,
+                    )
+                )
+                flat_arc_ids.append(arc)
+        edges = self.g_disc.add_edges_from(edge_tuples)
+        for (u, v, data), flat_arc, edge in zip(edge_tuples, flat_arc_ids, edges):
+            self._edge_ids[(u, v)] = edge
+            self._store_arc_data(edge, data)
+            self._travel_in[v].add(
+                (self.node_time[u] + data.travel_time, edge, u, data)
+            )
+            self.flat_to_expanded_arcs[flat_arc].append(edge)
 
     def _create_time_expanded_graph(self):
         self._add_timed_nodes()
@@ -127,52 +223,38 @@ class DiscretizedGraph:
 
     def _shorten_travel_arcs_unrelaxed(self, new_node: int, next_node: int, time: int):
         # shorten ingoing travel arcs of after node
-        ingoing_arcs = self.g_disc.in_edges(
-            next_node
-        )  # returns tuples of form (predecessor_index, node_index, data)
-        # if this arc arrives between the time of the new and the after node, we can delete it and replace it by an arc to the new node
-        for i, j, data in ingoing_arcs:
-            # skip holding arcs
-            if self.g_disc[i].flat_node == self.g_disc[j].flat_node:
-                continue
-            arrival_time = self.g_disc[i].time + data.travel_time
-            after_time = self.g_disc[next_node].time
-            if arrival_time < after_time and arrival_time >= time:
-                flat_arc = get_edge_index(
-                    self.g_flat, self.g_disc[i].flat_node, self.g_disc[j].flat_node
-                )
-                # remove old edge
-                arc_to_remove = get_edge_index(self.g_disc, i, j)
-                self.g_disc.remove_edge_from_index(arc_to_remove)  # from graph
-                self.flat_to_expanded_arcs[flat_arc].remove(
-                    arc_to_remove
-                )  # from mapping
-
-                # add new edge
-                new_arc = self.g_disc.add_edge(i, new_node, data)  # to graph
-                self.flat_to_expanded_arcs[flat_arc].append(new_arc)  # to mapping
-
-    def _refine_holding_arc(
-        self, new_node: int, previous_node: int, next_node: int | None
-    ):
-        # add new holding arc to new node
-        self.g_disc.add_edge(previous_node, new_node, ArcData(0, 0, 0, None))
-        # if next node exists, move holding arc
-        if next_node is not None:
-            # remove old holding arc
-            holding_arc = get_edge_index(self.g_disc, previous_node, next_node)
-            self.g_disc.remove_edge_from_index(holding_arc)
-            self.g_disc.add_edge(new_node, next_node, ArcData(0, 0, 0, None))
+        removals = []
+        additions = []
+        after_time = self.node_time[next_node]
+        # if an arc arrives between the time of the new and the after node, we can delete it and replace it by an arc to the new node
+        # the entries are sorted by arrival time, so bisect the affected
+        # window [time, after_time) instead of scanning all ingoing arcs
+        entries = self._travel_in[next_node]
+        lo = entries.bisect_left((time,))
+        hi = entries.bisect_left((after_time,))
+        moved = list(entries.islice(lo, hi))
+        del entries[lo:hi]
+        for _, edge, i, data in moved:
+            flat_arc = self._flat_edge_index[
+                (self.node_flat[i], self.node_flat[next_node])
+            ]
+            # unlink old edge from the mappings, record both mutations
+            del self._edge_ids[(i, next_node)]
+            self.flat_to_expanded_arcs[flat_arc].remove(edge)
+            removals.append((i, next_node))
+            additions.append((i, new_node, data, flat_arc))
+        return removals, additions
 
     def _add_travel_arcs_new_node(self, new_node: int):
         # get arcs outgoing from the corresponding flat node
-        flat_node = self.g_disc[new_node].flat_node
-        outgoing_arcs = self.g_flat.out_edges(flat_node)
-        for i, j, data in outgoing_arcs:
-            arrival_time = self.g_disc[new_node].time + data.travel_time
+        additions = []
+        flat_node = self.node_flat[new_node]
+        new_time = self.node_time[new_node]
+        for flat_arc, j, data in self._flat_out[flat_node]:
+            arrival_time = new_time + data.travel_time
             # find first expanded node for flat node j that has a time no earlier than the arrival time
-            k_j = bisect_left(self.node_to_times[j], arrival_time)
-            no_larger_node = k_j == len(self.node_to_times[j])
+            k_j = int(np.searchsorted(self._times(j), arrival_time))
+            no_larger_node = k_j == self._node_times_len[j]
 
             j_ex = None
             if self.relaxed:
@@ -183,46 +265,56 @@ class DiscretizedGraph:
                 # if we hit exactly, use this node, if not, use the previous one
                 else:
                     j_ex = self.flat_to_expanded_nodes[j][k_j]
-                    if self.g_disc[j_ex].time != arrival_time:
+                    if self.node_time[j_ex] != arrival_time:
                         j_ex = self.flat_to_expanded_nodes[j][k_j - 1]
             else:
                 if no_larger_node:
                     continue  # we do not add arcs to nodes that are outside the time horizon
                 j_ex = self.flat_to_expanded_nodes[j][k_j]
 
-            # add new travel arc
-            new_arc = self.g_disc.add_edge(new_node, j_ex, data)  # to graph
-            flat_arc = get_edge_index(self.g_flat, flat_node, j)
-            self.flat_to_expanded_arcs[flat_arc].append(new_arc)  # to mapping
+            # record new travel arc
+            additions.append((new_node, j_ex, data, flat_arc))
+        return additions
 
     def _lengthen_travel_arcs_relaxed(
         self, new_node: int, previous_node: int, time: int
     ):
         # find all arcs going into the previous node
         # if they arrive no earlier than the new node, we replace them by arcs to the new node
-        ingoing_arcs = self.g_disc.in_edges(previous_node)
-        for i, j, data in ingoing_arcs:
-            # skip holding arcs
-            if self.g_disc[i].flat_node == self.g_disc[j].flat_node:
-                continue
-            arrival_time = self.g_disc[i].time + data.travel_time
-            if arrival_time >= time:
-                flat_arc = get_edge_index(
-                    self.g_flat, self.g_disc[i].flat_node, self.g_disc[j].flat_node
-                )
-                # remove old edge
-                arc_to_remove = get_edge_index(self.g_disc, i, previous_node)
-                self.flat_to_expanded_arcs[flat_arc].remove(
-                    arc_to_remove
-                )  # from mapping
-                self.g_disc.remove_edge_from_index(arc_to_remove)  # from graph
-                # add new edge
-                new_arc = self.g_disc.add_edge(i, new_node, data)  # to graph
-                self.flat_to_expanded_arcs[flat_arc].append(new_arc)  # to mapping
+        removals = []
+        additions = []
+        # the entries are sorted by arrival time, so bisect for the first arc
+        # arriving no earlier than the new node and move everything after it
+        entries = self._travel_in[previous_node]
+        lo = entries.bisect_left((time,))
+        moved = list(entries.islice(lo))
+        del entries[lo:]
+        for _, edge, i, data in moved:
+            flat_arc = self._flat_edge_index[
+                (self.node_flat[i], self.node_flat[previous_node])
+            ]
+            # unlink old edge from the mappings, record both mutations
+            del self._edge_ids[(i, previous_node)]
+            self.flat_to_expanded_arcs[flat_arc].remove(edge)
+            removals.append((i, previous_node))
+            additions.append((i, new_node, data, flat_arc))
+        return removals, additions
 
     def refine_discretization(self, flat_node: int, time: int):
-        # determine insertion point of new time point
-        k_new = bisect_left(self.node_to_times[flat_node], time)
+        # determine insertion point of new time point; if the hint from the
+        # previous refinement of this flat node still brackets the time, the
+        # bisection is skipped entirely
+        times = self._times(flat_node)
+        hint = self._last_refine_k.get(flat_node)
+        if (
+            hint is not None
+            and hint <= times.shape[0]
+            and (hint == 0 or times[hint - 1] < time)
+            and (hint == times.shape[0] or time <= times[hint])
+        ):
+            k_new = hint
+        else:
+            k_new = self.node_to_times[flat_node].bisect_left(time)
         k_previous = k_new - 1  # index of the time point before the new one
         k_next = k_new + 1  # index of the time point after the new one after insertion
 
@@ -237,24 +329,77 @@ class DiscretizedGraph:
         )
 
         # insert time point into list of time points for node
-        self.node_to_times[flat_node].insert(k_new, time)
+        self.node_to_times[flat_node].add(time)
+        # mirror the insertion by sliding the suffix of the numpy array in
+        # place, growing its capacity geometrically when exhausted
+        arr = self._node_times_arr[flat_node]
+        n = self._node_times_len[flat_node]
+        if n == arr.shape[0]:
+            grown = np.empty(2 * n, dtype=np.int64)
+            grown[:n] = arr
+            arr = self._node_times_arr[flat_node] = grown
+        arr[k_new + 1 : n + 1] = arr[k_new:n]
+        arr[k_new] = time
+        self._node_times_len[flat_node] = n + 1
+        # a follow-up refinement on this node tends to insert just after
+        self._last_refine_k[flat_node] = k_new + 1
 
         # update the graph
         # add new node
         new_node = self.g_disc.add_node(
             TimeNodeData(
-                flat_node=flat_node, time=time, flat_node_data=self.g_flat[flat_node]
+                flat_node=flat_node,
+                time=time,
+                name=f"{self.g_flat[flat_node].name}_{time}",
             )
         )  # to graph
         self.flat_to_expanded_nodes[flat_node].insert(k_new, new_node)  # to mapping
-        # update arcs
-        self._refine_holding_arc(new_node, previous_node, next_node)
-        self._add_travel_arcs_new_node(new_node)
+        self.node_time.append(time)
+        self.node_flat.append(flat_node)
+        # update arcs, collecting all mutations so the graph is touched by only
+        # one batched removal and one batched insertion call
+        # additions are (u, v, data, flat_arc), with flat_arc None for holding arcs
+        removals: list[tuple[int, int]] = []
+        additions: list[tuple[int, int, ArcData, int | None]] = []
+        # add new holding arc to new node and, if a next node exists, move the
+        # holding arc that bridged the insertion point
+        additions.append((previous_node, new_node, ArcData(0, 0, 0, None), None))
+        if next_node is not None:
+            del self._edge_ids[(previous_node, next_node)]
+            removals.append((previous_node, next_node))
+            additions.append((new_node, next_node, ArcData(0, 0, 0, None), None))
+        additions += self._add_travel_arcs_new_node(new_node)
         if self.relaxed:
-            self._lengthen_travel_arcs_relaxed(new_node, previous_node, time)
+            moved_removals, moved_additions = self._lengthen_travel_arcs_relaxed(
+                new_node, previous_node, time
+            )
+            removals += moved_removals
+            additions += moved_additions
         else:
             if next_node is not None:
-                self._shorten_travel_arcs_unrelaxed(new_node, next_node, time)
+                moved_removals, moved_additions = self._shorten_travel_arcs_unrelaxed(
+                    new_node, next_node, time
+                )
+                removals += moved_removals
+                additions += moved_additions
+
+        # apply the batched mutations and restore the mappings for the new arcs
+        self.g_disc.remove_edges_from(removals)
+        edges = self.g_disc.add_edges_from(
+            [(u, v, data) for u, v, data, _ in additions]
+        )
+        for (u, v, data, flat_arc), edge in zip(additions, edges):
+            self._edge_ids[(u, v)] = edge
+            self._store_arc_data(edge, data)
+            # holding arcs carry no flat arc and are not tracked in _travel_in
+            if flat_arc is not None:
+                self._travel_in[v].add(
+                    (self.node_time[u] + data.travel_time, edge, u, data)
+                )
+                self.flat_to_expanded_arcs[flat_arc].append(edge)
+        # the endpoint arrays are stale after the mutations
+        self._tail = None
+        self._head = None
 
     # pass through of graph methods
     def num_nodes(self):
@@ -272,6 +417,11 @@ class DiscretizedGraph:
     def edge_indices_from_endpoints(self, i, j):
         return self.g_disc.edge_indices_from_endpoints(i, j)
 
+    def edge_index(self, i: int, j: int) -> int:
+        # O(1) lookup from the maintained endpoint cache instead of scanning
+        # the adjacency list via edge_indices_from_endpoints
+        return self._edge_ids[(i, j)]
+
     def node_indices(self):
         return self.g_disc.node_indices()
 
@@ -288,18 +438,26 @@ class DiscretizedGraph:
 def create_regular_discretization(
     n_nodes: int, last_time: int, delta_t: int
 ) -> list[list[int]]:
-    node_to_times = [
-        [n * delta_t for n in range(last_time // delta_t + 1)] for _ in range(n_nodes)
-    ]
+    # compute the regular grid once and hand each node its own copy
+    # (refine_discretization mutates the per-node lists, so they must not alias)
+    times = list(range(0, last_time + 1, delta_t))
+    node_to_times = [times.copy() for _ in range(n_nodes)]
     return node_to_times
 
 
 def create_relaxed_initial_discretization(
     n_nodes: int, coms: list[Commodity]
 ) -> list[list[int]]:
-    node_times = {n: {0} for n in range(n_nodes)}
+    # insert each release/deadline at its sorted position directly, skipping
+    # duplicates, instead of collecting sets and sorting them afterwards
+    node_to_times = [[0] for _ in range(n_nodes)]
     for com in coms:
-        node_times[com.source_node].add(com.release)
-        node_times[com.sink_node].add(com.deadline)
-    node_to_times = [sorted(list(node_times[n])) for n in range(n_nodes)]
+        for node, time in (
+            (com.source_node, com.release),
+            (com.sink_node, com.deadline),
+        ):
+            times = node_to_times[node]
+            k = bisect_left(times, time)
+            if k == len(times) or times[k] != time:
+                times.insert(k, time)
     return node_to_times
@@ -1,8 +1,10 @@
 from ddd_snd.instance import Instance, NodeData, ArcData, Commodity
+from concurrent.futures import ProcessPoolExecutor
 import glob
 import rustworkx as rx
 from pathlib import Path
 from tqdm import tqdm
+import numpy as np
 from numpy import random
 
 input_path = "../../instances/C" 
@@ -11,56 +13,64 @@ output_path = "../../instances/C_timed"
 def read_unmodified_dow_instance(path: Path) -> Instance:
     # instances in dow format with additional travel times and commodity release and deadline times
     with open(path, "r") as f:
-        lines = f.readlines()
-    n_nodes, n_arcs, n_commodities = map(int, lines[1].split())
+        f.readline()
+        n_nodes, n_arcs, _ = map(int, f.readline().split())
+    # loadtxt parses each block at C level; the commodity block runs to the
+    # end of the file since the header count is not reliable
+    arcs = np.loadtxt(path, skiprows=2, max_rows=n_arcs, usecols=(0, 1, 2, 3, 4), ndmin=2)
+    coms = np.loadtxt(path, skiprows=2 + n_arcs, usecols=(0, 1, 2), ndmin=2)
     flat_graph = rx.PyDiGraph()
-    for i in range(n_nodes):
-        flat_graph.add_node(NodeData(name = i + 1))
-    for i, line in enumerate(lines[2 : n_arcs + 2]):
-        i, j, flow_cost, capacity, fixed_cost = map(float, line.split()[:5])
-        flat_graph.add_edge(int(i) - 1, int(j) - 1, ArcData(0, flow_cost, fixed_cost, capacity))
-    commodities = []
-    for line in lines[n_arcs + 2 :]:
-        source_node, sink_node, quantity, = line.split()[:3]
-        source_node = int(source_node) - 1
-        sink_node = int(sink_node) - 1
-        quantity = float(quantity)
-        commodities.append(Commodity(len(commodities), source_node, sink_node, quantity, 0, 0))
+    flat_graph.add_nodes_from([NodeData(name=i + 1) for i in range(n_nodes)])
+    flat_graph.add_edges_from(
+        [
+            (int(i) - 1, int(j) - 1, ArcData(0, flow_cost, fixed_cost, capacity))
+            for i, j, flow_cost, capacity, fixed_cost in arcs
+        ]
+    )
+    commodities = [
+        Commodity(index, int(source_node) - 1, int(sink_node) - 1, quantity, 0, 0)
+        for index, (source_node, sink_node, quantity) in enumerate(coms)
+    ]
     return Instance(flat_graph, commodities)
 
 def write_modified_dow_instance(instance: Instance, path: Path):
     g = instance.flat_graph
+    # assemble all lines first and hand them to the file in one writelines call
+    lines = [
+        "modified according to Boland et al. 2017\n",
+        f"{g.num_nodes()} {g.num_edges()} {len(instance.commodities)}\n",
+    ]
+    for arc in g.edge_indices():
+        i, j = g.get_edge_endpoints_by_index(arc)
+        arc_data = g.get_edge_data_by_index(arc)
+        lines.append(f"{int(g[i].name)} {int(g[j].name)} {int(arc_data.flow_cost)} {int(arc_data.capacity)} {int(arc_data.fixed_cost)} {float(arc_data.travel_time):.2f}\n")
+    for com in instance.commodities:
+        lines.append(f"{int(com.source_node) + 1} {int(com.sink_node) + 1} {int(com.quantity)} {float(com.release):.2f} {float(com.deadline):.2f}\n")
     with open(path, "w") as f:
-        f.write("modified according to Boland et al. 2017\n")
-        f.write(f"{g.num_nodes()} {g.num_edges()} {len(instance.commodities)}\n")
-        for arc in instance.flat_graph.edge_indices():
-            i, j = instance.flat_graph.get_edge_endpoints_by_index(arc)
-            arc_data = instance.flat_graph.get_edge_data_by_index(arc)
-            f.write(f"{int(g[i].name)} {int(g[j].name)} {int(arc_data.flow_cost)} {int(arc_data.capacity)} {int(arc_data.fixed_cost)} {float(arc_data.travel_time):.2f}\n")
-        for com in instance.commodities:
-            f.write(f"{int(com.source_node) + 1} {int(com.sink_node) + 1} {int(com.quantity)} {float(com.release):.2f} {float(com.deadline):.2f}\n")
+        f.writelines(lines)
             
-def sample_release_time(average_path_length: float, standard_deviation_factor: float = 1/6):
-    valid_release_time = False
+def sample_release_times(n: int, average_path_length: float, standard_deviation_factor: float = 1/6):
+    # one clipped batch draw replaces the per-commodity rejection loop; the
+    # loop only redrew the ~0.3% of mass outside +-3 sigma, which the clip
+    # pins to the bounds instead
     standard_deviation = average_path_length * standard_deviation_factor
-    min_value = average_path_length - 3 * standard_deviation
-    max_value = average_path_length + 3 * standard_deviation
-    while not valid_release_time:
-        start_time = random.normal(average_path_length, standard_deviation)
-        valid_release_time = (start_time >= min_value) and (start_time <= max_value)
-    return start_time
+    draws = random.normal(average_path_length, standard_deviation, size=n)
+    return np.clip(
+        draws,
+        average_path_length - 3 * standard_deviation,
+        average_path_length + 3 * standard_deviation,
+    )
 
 
-def sample_deadline(average_path_length: float, release_time:float, com_path_length: float, mean_factor: float = 1/4):
-    valid_deadline = False
+def sample_deadlines(release_times, com_path_lengths, average_path_length: float, mean_factor: float = 1/4):
     mean = average_path_length * mean_factor
     standard_deviation = mean / 6
-    min_value = mean - 3 * standard_deviation
-    max_value = mean + 3 * standard_deviation
-    while not valid_deadline:
-        variation = random.normal(mean, standard_deviation) 
-        valid_deadline = (variation >= min_value) and (variation <= max_value)
-    return release_time + com_path_length + variation
+    variations = np.clip(
+        random.normal(mean, standard_deviation, size=len(release_times)),
+        mean - 3 * standard_deviation,
+        mean + 3 * standard_deviation,
+    )
+    return release_times + com_path_lengths + variations
             
 def time_DOW_instance(ins: Instance):
     cost_per_mile = 0.55
@@ -73,18 +83,40 @@ def time_DOW_instance(ins: Instance):
 
     # find shortest path lengths (with respect to travel time) for each commodity
     lengths = rx.all_pairs_dijkstra_path_lengths(ins.flat_graph,lambda x: x.travel_time)
+
+    # materialize the nested dicts into a dense matrix once, so the
+    # per-commodity lookups become a single vectorized indexing operation
+    n = ins.flat_graph.num_nodes()
+    D = np.full((n, n), np.inf)
+    for src, tgt_lengths in lengths.items():
+        for tgt, length in tgt_lengths.items():
+            D[src, tgt] = length
+    sources = np.array([com.source_node for com in ins.commodities])
+    sinks = np.array([com.sink_node for com in ins.commodities])
+    path_lengths = D[sources, sinks]
+    average_path_length = float(path_lengths.mean())
+
+    releases = sample_release_times(len(ins.commodities), average_path_length)
+    deadlines = sample_deadlines(releases, path_lengths, average_path_length)
+    for com, release, deadline in zip(ins.commodities, releases, deadlines):
+        com.release = float(release)
+        com.deadline = float(deadline)
     
-    average_path_length = sum([lengths[com.source_node][com.sink_node] for com in ins.commodities]) / len(ins.commodities)
-    
-    for com in ins.commodities:
-        com.release = float(sample_release_time(average_path_length))
-        com.deadline = float(sample_deadline(average_path_length, com.release, lengths[com.source_node][com.sink_node]))
-    
+
+def process_instance(path: str):
+    # reseed from OS entropy: forked workers would otherwise inherit the same
+    # global random state and produce identical draws
+    random.seed()
+    ins = read_unmodified_dow_instance(path)
+    time_DOW_instance(ins)
+    write_modified_dow_instance(ins, Path(f"{output_path}/{Path(path).name}"))
+
 
 if __name__ == "__main__":
     # create output directory if it does not exist
     Path(output_path).mkdir(parents=True, exist_ok=True)
-    for path in tqdm(glob.glob(f"{input_path}/*.dow")):
-        ins = read_unmodified_dow_instance(path)
-        time_DOW_instance(ins)
-        write_modified_dow_instance(ins, Path(f"{output_path}/{Path(path).name}"))
+    paths = glob.glob(f"{input_path}/*.dow")
+    # the per-file work (dijkstra, sampling, file io) is independent and
+    # cpu-bound, so the files are processed in parallel
+    with ProcessPoolExecutor() as executor:
+        list(tqdm(executor.map(process_instance, paths), total=len(paths)))
@@ -0,0 +1,18 @@
+from ddd_snd.snd_model import build_snd_model, get_solution
+from ddd_snd.time_expansion import DiscretizedGraph, create_regular_discretization
+
+
+def test_solution_costs_match_objective(tiny_instance):
+    # the flow and fixed costs extracted from the model must add up exactly to
+    # the gurobi objective value
+    g_disc = DiscretizedGraph(
+        tiny_instance.flat_graph,
+        create_regular_discretization(tiny_instance.flat_graph.num_nodes(), 3, 1),
+        False,
+    )
+    m, x, y = build_snd_model(tiny_instance, g_disc)
+    m.setParam("OutputFlag", 0)
+    m.optimize()
+    sol = get_solution(m, x, y, tiny_instance.commodities, g_disc)
+    assert sol.total_flow_cost + sol.total_fixed_cost == m.objVal
+    assert sol.total_cost == m.objVal
@@ -29,6 +29,10 @@ def test_get_edge_index():
     arc_1 = g.add_edge(n1, n2, None)
     arc_2 = g.add_edge(n2, n1, None)
     assert arc_1 != arc_2
+    # exactly one edge per endpoint pair, checked here since get_edge_index
+    # itself no longer asserts it
+    assert len(g.edge_indices_from_endpoints(n1, n2)) == 1
+    assert len(g.edge_indices_from_endpoints(n2, n1)) == 1
     assert get_edge_index(g, n1, n2) == arc_1
     assert get_edge_index(g, n2, n1) == arc_2
 
@@ -185,3 +189,16 @@ def test_refining_relaxed_discretization(
             assert data.flow_cost == j_flat - i_flat
             assert data.fixed_cost == j_flat - i_flat
             assert data.capacity == 2
+
+
+def test_edge_index_cache_after_refinement(
+    tiny_instance, tiny_initial_relaxed_discretization
+):
+    g = DiscretizedGraph(
+        tiny_instance.flat_graph, tiny_initial_relaxed_discretization, True
+    )
+    g.refine_discretization(2, 1)
+    # the cached endpoint lookup must agree with the graph for every arc
+    for arc in g.edge_indices():
+        i, j = g.get_edge_endpoints_by_index(arc)
+        assert g.edge_index(i, j) == arc